@@ -1,10 +1,16 @@
+import heapq
+import os
+import re
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import click
 
 from .core import (
-    discover_targets,
+    empty_discovery,
+    iter_targets,
+    find_requirements,
     scan_python_files,
     scan_notebooks,
     scan_dependencies,
@@ -13,6 +19,11 @@ from .core import (
 )
 
 
+# Lines worth highlighting: tool messages and findings
+_CLASSIFY_RE = re.compile(r"not found|UNSAFE|(?i:risk)|CVE-|PYSEC-")
+_PREFIX = ("⚠", "⏩")
+
+
 def hr(char="─", width=60, color="bright_white"):
     line = char * width
     click.secho(f"{line}", fg=color, dim=True)
@@ -29,8 +40,8 @@ def _print_discovery(discovery: dict):
 
     if notebooks:
         click.secho(f"📓 Notebooks ({len(notebooks)})", fg="bright_blue", bold=True)
-        for nb in notebooks[:10]:
-            click.secho(f"   • {nb.name}", fg="bright_blue")
+        for nb in heapq.nsmallest(10, notebooks):
+            click.secho(f"   • {os.path.basename(nb)}", fg="bright_blue")
         if len(notebooks) > 10:
             click.secho(f"   • ... (+{len(notebooks) - 10} more)", dim=True)
     else:
@@ -38,8 +49,8 @@ def _print_discovery(discovery: dict):
 
     if py_files:
         click.secho(f"🐍 Python files ({len(py_files)})", fg="bright_green", bold=True)
-        for py in py_files[:10]:
-            click.secho(f"   • {py.name}", fg="bright_green")
+        for py in heapq.nsmallest(10, py_files):
+            click.secho(f"   • {os.path.basename(py)}", fg="bright_green")
         if len(py_files) > 10:
             click.secho(f"   • ... (+{len(py_files) - 10} more)", dim=True)
     else:
@@ -53,8 +64,8 @@ def _print_discovery(discovery: dict):
 
     if models:
         click.secho(f"🧠 Models ({len(models)})", fg="magenta", bold=True)
-        for model in models[:10]:
-            click.secho(f"   • {model.name}", fg="magenta")
+        for model in heapq.nsmallest(10, models):
+            click.secho(f"   • {os.path.basename(model)}", fg="magenta")
         if len(models) > 10:
             click.secho(f"   • ... (+{len(models) - 10} more)", dim=True)
     else:
@@ -83,9 +94,7 @@ def _print_scan_section(
     for line in lines:
         if not line.strip():
             continue
-        if "not found" in line or line.startswith("⚠") or line.startswith("⏩"):
-            click.secho(f"│ {line}", fg="white")
-        elif "UNSAFE" in line or "risk" in line.lower() or "CVE-" in line or "PYSEC-" in line:
+        if line.startswith(_PREFIX) or _CLASSIFY_RE.search(line):
             click.secho(f"│ {line}", fg="white")
         else:
             click.secho(f"│  {line}", fg="white")
@@ -101,7 +110,8 @@ def _print_scan_section(
 @click.option("--notebooks", is_flag=True, help="Scan .ipynb files.")
 @click.option("--deps", "--dependencies", is_flag=True, help="Scan requirements.txt.")
 @click.option("--models", is_flag=True, help="Scan model files (.pt, .pkl, etc.).")
-def main(target, full, python, notebooks, deps, models):
+@click.option("--no-cache", is_flag=True, help="Ignore and don't write the scan cache.")
+def main(target, full, python, notebooks, deps, models, no_cache):
     target = Path(target).resolve()
     start_time = time.time()
     
@@ -119,51 +129,52 @@ def main(target, full, python, notebooks, deps, models):
     click.secho("  ──  vulnerabilities scanner for ML projects", fg="bright_green")
     click.echo()
 
-    # Discovery
-    discovery = discover_targets(
-        target,
-        scan_notebooks=do_scan_notebooks,
-        scan_python=do_scan_python,
-        scan_deps=do_scan_deps,
-        scan_models=do_scan_models,
-    )
-    _print_discovery(discovery)
-
-    # Scan Phase
-    click.secho("──[ 🛡️  Scan ]──", fg="bright_cyan", bold=True)
-    hr()
-    click.echo()
-
     any_issue = False
     any_error = False
+    sections = {}
+
+    # Scanners are independent subprocesses; run them concurrently and
+    # print results in a fixed order on the main thread. pip-audit only
+    # needs requirements.txt, so it starts before discovery walks the tree.
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # Discovery
+        discovery = empty_discovery(do_scan_notebooks, do_scan_python, do_scan_models)
+        buckets = set(discovery)
+        if do_scan_deps:
+            discovery["requirements"] = find_requirements(target)
+            sections["deps"] = pool.submit(scan_dependencies, discovery["requirements"])
+
+        for bucket, path in iter_targets(target, buckets):
+            discovery[bucket].append(path)
+
+        if do_scan_python:
+            sections["python"] = pool.submit(
+                scan_python_files, target, discovery["py_files"], use_cache=not no_cache
+            )
+        if do_scan_notebooks:
+            sections["notebooks"] = pool.submit(scan_notebooks, discovery["notebooks"], use_cache=not no_cache)
+        if do_scan_models:
+            sections["models"] = pool.submit(scan_models, discovery["models"])
+
+        _print_discovery(discovery)
+
+        # Scan Phase
+        click.secho("──[ 🛡️  Scan ]──", fg="bright_cyan", bold=True)
+        hr()
+        click.echo()
 
-    # Python
-    if do_scan_python:
-        output, code = scan_python_files(discovery.get("py_files", []))
-        issue, error = _print_scan_section("🐍 bandit — Python code", output, code)
-        any_issue |= issue
-        any_error |= error
-
-    # Notebooks
-    if do_scan_notebooks:
-        output, code, _ = scan_notebooks(discovery.get("notebooks", []))
-        issue, error = _print_scan_section("📓 bandit — Notebooks", output, code, is_notebook=True)
-        any_issue |= issue
-        any_error |= error
-
-    # Dependencies
-    if do_scan_deps:
-        output, code = scan_dependencies(discovery.get("requirements"))
-        issue, error = _print_scan_section("📦 pip-audit — Dependencies", output, code)
-        any_issue |= issue
-        any_error |= error
-
-    # Models
-    if do_scan_models:
-        output, code = scan_models(discovery.get("models", []))
-        issue, error = _print_scan_section("🧠 modelscan — Models", output, code)
-        any_issue |= issue
-        any_error |= error
+        for key, title in (
+            ("python", "🐍 bandit — Python code"),
+            ("notebooks", "📓 bandit — Notebooks"),
+            ("deps", "📦 pip-audit — Dependencies"),
+            ("models", "🧠 modelscan — Models"),
+        ):
+            if key not in sections:
+                continue
+            output, code = sections[key].result()[:2]
+            issue, error = _print_scan_section(title, output, code, is_notebook=key == "notebooks")
+            any_issue |= issue
+            any_error |= error
 
     hr()
     click.echo()
@@ -1,8 +1,32 @@
+import ast
+import bisect
+import datetime
+import functools
+import hashlib
+import importlib.metadata
+import io
 import json
+import logging
+import os
+import re
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional, Set
+from typing import Iterator, List, Tuple, Optional, Set, TextIO
+
+try:
+    from orjson import loads as _orjson_loads
+except ImportError:  # orjson is optional; stdlib json also accepts bytes
+    _orjson_loads = None
+
+try:
+    import ijson as _ijson
+except ImportError:  # ijson is optional; fall back to a full parse
+    _ijson = None
+
 
 
 class ToolError(Exception):
@@ -10,85 +34,254 @@ class ToolError(Exception):
     pass
 
 
-def discover_targets(
-    target: Path,
+MODEL_EXTS = {".pt", ".pth", ".pkl", ".joblib", ".h5", ".safetensors"}
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache"}
+CACHE_DIR = Path.home() / ".cache" / "sanityml"
+# Empty bandit config, so the CLI does not search the scanned tree for one
+BANDIT_INI = Path(__file__).with_name("bandit.ini")
+# Bump when the notebook conversion or the cached report format changes
+_CACHE_FORMAT = "2"
+# Cache entries not read or written for this long are deleted
+_CACHE_MAX_AGE = 30 * 24 * 3600
+
+_CELL_MARKER = "# --- Cell "
+_FILE_MARKER = "# === FILE: "
+# Fixed first two lines of bandit's stdin, so no notebook path or cell can
+# land where Python looks for a source-encoding declaration.
+_STDIN_PREAMBLE = "# -*- coding: utf-8 -*-\n\n"
+_STDIN_SKIPPED = re.compile(r"^\s*<stdin> \((.*)\)\s*$", re.MULTILINE)
+_STDIN_LOCATION = re.compile(r"<stdin>:(\d+):")
+_CONTEXT_LINE = re.compile(r"(\d+)\t")
+_RUN_STARTED = re.compile(r"^Run started:.*$", re.MULTILINE)
+
+# File extension -> discovery bucket
+_EXT_TABLE = {".py": "py_files", ".ipynb": "notebooks", **{ext: "models" for ext in MODEL_EXTS}}
+
+
+def iter_targets(target: Path, buckets: Set[str]) -> Iterator[Tuple[str, str]]:
+    """Walk the tree once with os.scandir, yielding (bucket, path) as files are found."""
+    table = {ext: bucket for ext, bucket in _EXT_TABLE.items() if bucket in buckets}
+    if not table:
+        return
+    stack = [str(target)]
+
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                    continue
+                dot = name.rfind(".")
+                bucket = table.get(name[dot:]) if dot != -1 else None
+                if bucket:
+                    yield bucket, entry.path
+
+
+def find_requirements(target: Path) -> Optional[Path]:
+    """The top-level requirements.txt, if any."""
+    req_file = target / "requirements.txt"
+    return req_file if req_file.exists() else None
+
+
+def empty_discovery(
     scan_notebooks: bool = True,
     scan_python: bool = True,
-    scan_deps: bool = True,
     scan_models: bool = True,
 ) -> dict:
-    """Discover files to scan. Returns dict with lists/paths."""
+    """Empty path lists for each enabled iter_targets bucket."""
     results = {}
-
     if scan_python:
-        results["py_files"] = sorted(target.rglob("*.py"))
+        results["py_files"] = []
     if scan_notebooks:
-        results["notebooks"] = sorted(target.rglob("*.ipynb"))
-    if scan_deps:
-        req_file = target / "requirements.txt"
-        results["requirements"] = req_file if req_file.exists() else None
+        results["notebooks"] = []
     if scan_models:
-        model_exts = ["*.pt", "*.pth", "*.pkl", "*.joblib", "*.h5"]
-        models = {p for ext in model_exts for p in target.rglob(ext)}
-        results["models"] = sorted(models)
+        results["models"] = []
+    return results
+
+
+def discover_targets(
+    target: Path,
+    scan_notebooks: bool = True,
+    scan_python: bool = True,
+    scan_deps: bool = True,
+    scan_models: bool = True,
+) -> dict:
+    """Discover files to scan. Returns dict with (unsorted) lists of path strings."""
+    results = empty_discovery(scan_notebooks, scan_python, scan_models)
+    for bucket, path in iter_targets(target, set(results)):
+        results[bucket].append(path)
+    if scan_deps:
+        results["requirements"] = find_requirements(target)
 
     return results
 
 
-def notebook_to_python(notebook_path: Path, output_path: Path) -> None:
-    """Convert .ipynb to .py (only code cells). Raises on error."""
+def _json_loads(raw: bytes):
+    """json.loads, through orjson when it is installed.
+
+    orjson rejects bare NaN/Infinity, which nbformat writes and Jupyter
+    reads, so anything it refuses is re-parsed with the stdlib.
+    """
+    if _orjson_loads is not None:
+        try:
+            return _orjson_loads(raw)
+        except ValueError:
+            pass
+    return json.loads(raw)
+
+
+def _iter_cells(raw: bytes) -> Iterator[Tuple[Optional[str], object]]:
+    """Yield (cell_type, source) per cell of a notebook's JSON bytes.
+
+    With ijson installed the JSON is parsed as an event stream and cell
+    outputs (often large base64 images) are never built into Python objects.
+    """
+    done = 0
+    if _ijson is not None:
+        cell_type, source = None, []
+        try:
+            for prefix, event, value in _ijson.parse(raw):
+                if prefix == "cells.item.cell_type":
+                    cell_type = value
+                elif prefix == "cells.item.source":
+                    if event == "string":
+                        source = value
+                    elif event == "start_array":
+                        source = []
+                elif prefix == "cells.item.source.item":
+                    source.append(value)
+                elif prefix == "cells.item":
+                    if event == "start_map":
+                        cell_type, source = None, []
+                    elif event == "end_map":
+                        done += 1
+                        yield cell_type, source
+            return
+        except _ijson.JSONError:
+            # yajl rejects bare NaN/Infinity, which nbformat writes; finish
+            # with a full parse, skipping the cells already yielded.
+            pass
+
+    nb = _json_loads(raw)
+    for cell in nb.get("cells", [])[done:]:
+        yield cell.get("cell_type"), cell.get("source", [])
+
+
+def notebook_to_python(notebook_path: Path, f: TextIO, raw: Optional[bytes] = None) -> None:
+    """Write the code cells of an .ipynb to a text stream as Python. Raises on error.
+
+    Pass raw to reuse notebook bytes the caller has already read.
+    """
     try:
-        data = notebook_path.read_text(encoding="utf-8")
-        nb = json.loads(data)
-        cells = nb.get("cells", [])
-        if not cells:
+        if raw is None:
+            raw = notebook_path.read_bytes()
+        # A notebook without a code cell never contains the JSON string "code"
+        # (unless written with \u escapes), so skip the parse for it.
+        if b'"code"' not in raw and b"\\u" not in raw:
+            raise ValueError("No executable code in notebook")
+
+        parts = [f"# Converted from {notebook_path.name}\n"]
+        cells_found = False
+        code_found = False
+        for i, (cell_type, source) in enumerate(_iter_cells(raw)):
+            cells_found = True
+            if cell_type == "code":
+                if isinstance(source, str):
+                    lines = source.splitlines(keepends=True)
+                elif isinstance(source, list):
+                    lines = source
+                else:
+                    continue
+
+                # Skip empty or comment-only cells
+                if lines and any(line.strip() and not line.strip().startswith("#") for line in lines):
+                    code_found = True
+                    parts.append(f"\n{_CELL_MARKER}{i+1} ---\n")
+                    parts.extend(lines)
+                    parts.append("\n")
+
+        if not cells_found:
             raise ValueError("No cells in notebook")
+        if not code_found:
+            raise ValueError("No executable code in notebook")
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(f"# Converted from {notebook_path.name}\n")
-            code_found = False
-            for i, cell in enumerate(cells):
-                if cell.get("cell_type") == "code":
-                    source = cell.get("source", [])
-                    if isinstance(source, str):
-                        lines = source.splitlines(keepends=True)
-                    elif isinstance(source, list):
-                        lines = source
-                    else:
-                        continue
-
-                    # Skip empty or comment-only cells
-                    if lines and any(line.strip() and not line.strip().startswith("#") for line in lines):
-                        code_found = True
-                        f.write(f"\n# --- Cell {i+1} ---\n")
-                        f.writelines(lines)
-                        f.write("\n")
-
-            if not code_found:
-                raise ValueError("No executable code in notebook")
+        f.write("".join(parts))
 
     except Exception as e:
         raise RuntimeError(f"Conversion failed for {notebook_path.name}: {type(e).__name__}: {e}")
 
 
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+
+def _drain(stream, buf: bytearray) -> None:
+    """Append everything readable from a pipe to buf, then close it."""
+    with stream:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            buf += chunk
+
+
+def _decode_stripped(buf: bytearray) -> str:
+    """Decode buf once, trimming surrounding whitespace without copying it first."""
+    start, end = 0, len(buf)
+    while start < end and buf[start] in _WHITESPACE:
+        start += 1
+    while end > start and buf[end - 1] in _WHITESPACE:
+        end -= 1
+    return str(memoryview(buf)[start:end], "utf-8", "replace")
+
+
+def _feed(stream, data: bytes) -> None:
+    """Write data to a pipe and close it; the tool may exit before reading it all."""
+    try:
+        stream.write(data)
+        stream.close()
+    except (BrokenPipeError, OSError):
+        pass
+
+
 def run_tool(
     cmd: List[str],
     *, 
     label: str = "Running",
     timeout: int = 120,
+    input: Optional[bytes] = None,
+    cwd: Optional[Path] = None,
 ) -> Tuple[str, int]:
     """Run subprocess, return (output, exit_code). Never raises; safe for CLI."""
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
+        stdin = subprocess.PIPE if input is not None else None
+        proc = subprocess.Popen(
+            cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd
         )
-        stdout = result.stdout.strip()
-        stderr = result.stderr.strip()
-        output = stdout or stderr
-        return output, result.returncode
+        # The threads own the pipes and close them when done
+        stdout, stderr = bytearray(), bytearray()
+        readers = [
+            threading.Thread(target=_drain, args=(proc.stdout, stdout), daemon=True),
+            threading.Thread(target=_drain, args=(proc.stderr, stderr), daemon=True),
+        ]
+        if input is not None:
+            readers.append(threading.Thread(target=_feed, args=(proc.stdin, input), daemon=True))
+        for reader in readers:
+            reader.start()
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            # A grandchild may still hold the pipes open; don't wait for it
+            raise
+        for reader in readers:
+            reader.join()
+
+        output = _decode_stripped(stdout) or _decode_stripped(stderr)
+        return output, proc.returncode
 
     except FileNotFoundError:
         cmd_name = cmd[0]
@@ -99,46 +292,364 @@ def run_tool(
         return f"unexpected error: {e}", -1
 
 
-def scan_python_files(target_paths: List[Path], label: str = "Scanning Python files") -> Tuple[str, int]:
-    if not target_paths:
+class _ReportBuffer(io.StringIO):
+    """In-memory file for bandit's formatters, which close and name their output."""
+    name = "<sanityml>"
+
+    def close(self) -> None:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _bandit_config():
+    """Import bandit and load its config once per process. None if bandit is unavailable."""
+    try:
+        from bandit.core import config
+    except ImportError:
+        return None
+    # The bandit CLI configures logging itself; keep its warnings off our console.
+    logging.getLogger("bandit").addHandler(logging.NullHandler())
+    return config.BanditConfig()
+
+
+def _file_stamp(fname: str) -> Optional[List[int]]:
+    """Integer stat fields that change whenever a file is rewritten.
+
+    ctime is included because archives and `touch` can restore mtime, but
+    not ctime.
+    """
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_ctime_ns, st.st_size]
+
+
+def _run_bandit_in_process(conf, target: Path, py_files: List[str], use_cache: bool = True) -> Tuple[str, int]:
+    """Equivalent of `bandit <py_files...> -f txt` without a subprocess.
+
+    Findings and metrics are cached per file in one CACHE_DIR/mtimes-*.json
+    per target and reused for files whose stat stamp is unchanged, so only
+    edited files are re-analysed.
+    """
+    from bandit.core import constants, issue, manager
+
+    try:
+        b_mgr = manager.BanditManager(conf, "file")
+        # Use our own discovery rather than bandit's: its --exclude entries
+        # are plain substrings of the full path, so "venv" would also drop
+        # /home/me/devenv/proj/*.py and ".git" would drop .github/.
+        b_mgr.files_list = sorted(py_files)
+
+        # One file per target, so entries for projects no longer scanned
+        # age out through _prune_cache like every other cache entry
+        cache_path = CACHE_DIR / f"mtimes-{_hexdigest(os.path.abspath(target).encode())}.json"
+        version = [_cache_tag(), _tool_version("bandit")]
+        cache = {}
+        if use_cache:
+            _prune_cache()
+            try:
+                cache = json.loads(_cache_load(cache_path))
+                if cache.get("version") != version:
+                    cache = {}
+            except (OSError, ValueError):
+                cache = {}
+        files = cache.get("files", {})
+
+        stamps = {fname: _file_stamp(fname) for fname in b_mgr.files_list}
+        changed, reused = [], []
+        for fname, stamp in stamps.items():
+            entry = files.get(fname)
+            if stamp is not None and entry and entry["stamp"] == stamp:
+                reused.append(fname)
+                b_mgr.metrics.data[fname] = entry["metrics"]
+                b_mgr.results.extend(issue.issue_from_dict({"code": None, **d}) for d in entry["issues"])
+            else:
+                changed.append(fname)
+
+        # run_tests aggregates metrics, including the reused ones set above
+        b_mgr.files_list = changed
+        b_mgr.run_tests()
+
+        level = constants.RANKING[0]
+        buf = _ReportBuffer()
+        b_mgr.output_results(3, level, level, buf, "txt")
+        code = 1 if b_mgr.results_count(sev_filter=level, conf_filter=level) > 0 else 0
+
+        # Rewrite the cache with this run's files; skipped files are never cached
+        files = {}
+        issues = {}
+        for result in b_mgr.results:
+            issues.setdefault(result.fname, []).append(result.as_dict(with_code=False))
+        for fname in reused + b_mgr.files_list:
+            if stamps[fname] is not None:
+                files[fname] = {
+                    "stamp": stamps[fname],
+                    "metrics": b_mgr.metrics.data[fname],
+                    "issues": issues.get(fname, []),
+                }
+        if use_cache:
+            _cache_store(cache_path, json.dumps({"version": version, "files": files}).encode())
+
+        return buf.getvalue().strip(), code
+    except Exception as e:
+        return f"unexpected error: {e}", -1
+
+
+def scan_python_files(
+    target: Path,
+    py_files: List[str],
+    label: str = "Scanning Python files",
+    use_cache: bool = True,
+) -> Tuple[str, int]:
+    """Run bandit over the .py files discovery found under the project root.
+
+    Uses bandit's Python API when it is importable, so its plugins are only
+    loaded once per process; otherwise falls back to running the bandit
+    executable recursively over the root, skipping SKIP_DIRS.
+    """
+    if not py_files:
         return "⏩ No Python files to scan", 0
-    paths = [str(p) for p in target_paths]
-    return run_tool(["bandit", "-r"] + paths + ["-f", "txt"], label=label)
+    conf = _bandit_config()
+    if conf is not None:
+        return _run_bandit_in_process(conf, target, py_files, use_cache)
+    # Run from the root so the exclude globs only see paths inside the
+    # project, and match whole path parts instead of substrings.
+    exclude = ",".join(f"*/{name}/*" for name in sorted(SKIP_DIRS))
+    return run_tool(
+        ["bandit", "-r", ".", "-f", "txt", "--exclude", exclude, "--ini", str(BANDIT_INI)],
+        label=label,
+        cwd=target,
+    )
+
+
+def _hexdigest(data: bytes) -> str:
+    """Cache key for scanned content. Must be collision-resistant: a colliding
+    notebook would be reported with another notebook's (clean) result."""
+    return hashlib.sha256(data).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_version(name: str) -> Optional[str]:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _cache_tag() -> str:
+    """Identifies the code that produced a cache entry, so upgrades invalidate it."""
+    return f"sanityml-{_tool_version('sanityml')}/{_CACHE_FORMAT}"
+
+
+def _cache_load(path: Path) -> bytes:
+    """Read a cache entry and mark it as recently used. Raises OSError on a miss."""
+    data = path.read_bytes()
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
 
 
-def scan_notebooks(notebooks: List[Path], label: str = "Scanning notebooks") -> Tuple[str, int, List[str]]:
+def _prune_cache() -> None:
+    """Delete cache entries unused for _CACHE_MAX_AGE."""
+    cutoff = time.time() - _CACHE_MAX_AGE
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+
+
+def _cache_store(path: Path, data: bytes) -> None:
+    """Atomically write a cache entry. Cache failures are never fatal."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+    except OSError:
+        pass
+
+
+def _convert_notebook(notebook_path: Path, use_cache: bool = True) -> Tuple[str, str]:
+    """notebook_to_python into a string, reusing a cached conversion. Returns (key, source)."""
+    try:
+        raw = notebook_path.read_bytes()
+    except OSError as e:
+        raise RuntimeError(f"Conversion failed for {notebook_path.name}: {type(e).__name__}: {e}")
+
+    key = _hexdigest(f"{_cache_tag()}\0{notebook_path.name}\0".encode() + raw)
+    cached = CACHE_DIR / f"{key}.py"
+    if use_cache:
+        try:
+            return key, _cache_load(cached).decode("utf-8")
+        except (OSError, ValueError):
+            pass
+
+    buf = io.StringIO()
+    notebook_to_python(notebook_path, buf, raw)
+    source = buf.getvalue()
+    if use_cache:
+        _cache_store(cached, source.encode("utf-8"))
+    return key, source
+
+
+def _cell_starts(lines: List[str]) -> List[Tuple[int, str]]:
+    """(first code line, cell label) for each cell marker in converted source lines."""
+    return [
+        (n + 1, "cell " + line[len(_CELL_MARKER):].rstrip(" -"))
+        for n, line in enumerate(lines, 1)
+        if line.startswith(_CELL_MARKER)
+    ]
+
+
+def _remap_stdin_report(output: str, starts: List[int], segments: List[Tuple[str, str]]) -> str:
+    """Rewrite bandit's <stdin> line numbers into notebook and cell positions.
+
+    starts[i] is the first line (1-based) of segments[i] = (notebook, cell) in
+    the concatenated source fed to bandit. Context lines that spill over into
+    a neighbouring segment are dropped.
+    """
+    def locate(lineno: int) -> Tuple[int, int]:
+        i = bisect.bisect_right(starts, lineno) - 1
+        return i, lineno - starts[i] + 1
+
+    remapped = []
+    current = None
+    for line in output.splitlines():
+        m = _STDIN_LOCATION.search(line)
+        if m:
+            current, lineno = locate(int(m.group(1)))
+            notebook, cell = segments[current]
+            line = f"{line[:m.start()]}{notebook} [{cell}]:{lineno}:{line[m.end():]}"
+        else:
+            m = _CONTEXT_LINE.match(line)
+            if m and current is not None:
+                i, lineno = locate(int(m.group(1)))
+                if i != current:
+                    continue
+                line = f"{lineno}{line[m.end(1):]}"
+        remapped.append(line)
+    return "\n".join(remapped)
+
+
+def scan_notebooks(
+    notebooks: List[str],
+    label: str = "Scanning notebooks",
+    use_cache: bool = True,
+) -> Tuple[str, int, List[str]]:
     """Returns (output, code, errors)"""
     if not notebooks:
         return "⏩ No notebooks to scan", 0, []
+    if use_cache:
+        _prune_cache()
 
     errors = []
-    py_files_nb = []
+    keys = []
+    parts = [_STDIN_PREAMBLE]
+    starts, segments = [1], [("<stdin>", "preamble")]
+    lineno = 1 + _STDIN_PREAMBLE.count("\n")
 
-    with tempfile.TemporaryDirectory() as tmpdir:
+    jobs = []
+    with ThreadPoolExecutor(max_workers=min(16, len(notebooks))) as pool:
         for nb in notebooks:
-            py_path = Path(tmpdir) / f"{nb.stem}_{nb.parent.name}.py"
-            try:
-                notebook_to_python(nb, py_path)
-                if py_path.exists() and py_path.stat().st_size > 30:
-                    py_files_nb.append(py_path)
-            except Exception as e:
-                errors.append(str(e))
-
-        if errors:
-            error_summary = "\n".join(f"⚠ {err}" for err in errors)
-        else:
-            error_summary = ""
+            jobs.append((nb, pool.submit(_convert_notebook, Path(nb), use_cache)))
 
-        if py_files_nb:
-            output, code = run_tool(
-                ["bandit", "-r"] + [str(p) for p in py_files_nb] + ["-f", "txt"],
-                label=label
-            )
+    # Feed every notebook to a single bandit process on stdin, recording
+    # where each notebook cell starts so findings can be mapped back.
+    for nb, future in jobs:
+        exc = future.exception()
+        if exc is not None:
+            errors.append(str(exc))
+            continue
+        key, source = future.result()
+        if len(source) <= 30:
+            continue
+
+        # Python also ends lines at a lone \r; normalise so line counts match
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+        if not source.endswith("\n"):
+            source += "\n"
+        lines = source.split("\n")[:-1]
+        cells = _cell_starts(lines)
+        header = f"{_FILE_MARKER}{' '.join(nb.splitlines())} ===\n"
+        try:
+            # bandit skips the whole input on a syntax error, so drop
+            # notebooks it could not parse (e.g. IPython magics) up front.
+            # Check the exact bytes bandit will read for this notebook.
+            chunk = (_STDIN_PREAMBLE + header + source).encode("utf-8")
+            compile(chunk, nb, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+        except SyntaxError as e:
+            where = ""
+            src_lineno = (e.lineno or 0) - _STDIN_PREAMBLE.count("\n") - 1
+            for start, cell in cells:
+                if start <= src_lineno:
+                    where = f" ({cell}, line {src_lineno - start + 1})"
+            errors.append(f"Skipped {Path(nb).name}: SyntaxError: {e.msg}{where}")
+            continue
+        except (ValueError, RecursionError, MemoryError) as e:
+            # Nesting too deep for the parser; bandit could not parse it either
+            errors.append(f"Skipped {Path(nb).name}: {type(e).__name__}: {e}")
+            continue
+
+        keys.append(f"{key}:{nb}")
+        parts.append(header)
+        parts.append(source)
+        starts.append(lineno)
+        segments.append((nb, "header"))
+        for start, cell in cells:
+            starts.append(lineno + start)
+            segments.append((nb, cell))
+        lineno += 1 + len(lines)
+
+    if errors:
+        error_summary = "\n".join(f"⚠ {err}" for err in errors)
+    else:
+        error_summary = ""
+
+    if not keys:
+        if not errors:
+            return "⚠ No executable code in notebooks", 0, []
+        return error_summary, 0, errors
+
+    # Reuse bandit's report when the same notebooks were already
+    # scanned with the same bandit version.
+    bandit_version = _tool_version("bandit")
+    report = None
+    if use_cache and bandit_version:
+        run_key = _hexdigest(" ".join([_cache_tag(), bandit_version] + sorted(keys)).encode())
+        report = CACHE_DIR / f"bandit-{run_key}.json"
+        try:
+            output, code = json.loads(_cache_load(report))
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            output = _RUN_STARTED.sub(f"Run started:{now} (cached report)", output, count=1)
             return f"{error_summary}\n{output}".strip(), code, errors
+        except (OSError, ValueError):
+            pass
+
+    output, code = run_tool(
+        ["bandit", "-", "-f", "txt", "--ini", str(BANDIT_INI)],
+        label=label,
+        input="".join(parts).encode("utf-8"),
+    )
+    if code in (0, 1):
+        skipped = _STDIN_SKIPPED.search(output)
+        if skipped:
+            # Nothing was analysed; never let this read as a clean pass
+            code = 2
+            output = f"⚠ bandit could not parse the notebook sources ({skipped.group(1)}); notebooks were not scanned\n{output}"
         else:
-            if not errors:
-                return "⚠ No executable code in notebooks", 0, []
-            return error_summary, 0, errors
+            output = _remap_stdin_report(output, starts, segments)
+            if report:
+                _cache_store(report, json.dumps([output, code]).encode())
+    return f"{error_summary}\n{output}".strip(), code, errors
 
 
 def scan_dependencies(req_file: Optional[Path], label: str = "Scanning dependencies") -> Tuple[str, int]:
@@ -147,17 +658,16 @@ def scan_dependencies(req_file: Optional[Path], label: str = "Scanning dependenc
     return run_tool(["pip-audit", "-r", str(req_file)], label=label)
 
 
-def scan_models(models: List[Path], label: str = "Scanning models") -> Tuple[str, int]:
+def scan_models(models: List[str], label: str = "Scanning models") -> Tuple[str, int]:
     if not models:
         return "⏩ No model files to scan", 0
-    paths = [str(m) for m in models]
-    return run_tool(["modelscan", "-p"] + paths, label=label)
+    return run_tool(["modelscan", "-p"] + list(models), label=label)
 
 
 def generate_report_summary(
-    py_files: List[Path],
-    notebooks: List[Path],
-    models: List[Path],
+    py_files: List[str],
+    notebooks: List[str],
+    models: List[str],
     req_exists: bool,
     duration: float,
     any_issue: bool,
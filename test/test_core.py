@@ -0,0 +1,409 @@
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from sanityml import core
+
+FIXTURES = Path(__file__).parent / "code"
+
+needs_bandit = pytest.mark.skipif(shutil.which("bandit") is None, reason="bandit executable not on PATH")
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(core, "CACHE_DIR", cache)
+    return cache
+
+
+def write_notebook(path, cells):
+    """cells: list of (cell_type, source lines)."""
+    path.write_text(json.dumps({
+        "cells": [
+            {"cell_type": cell_type, "metadata": {}, "outputs": [], "source": source}
+            for cell_type, source in cells
+        ],
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }))
+    return path
+
+
+def findings(output):
+    """[(notebook, cell, line, [(context line, text), ...])] from a remapped report."""
+    result = []
+    for line in output.splitlines():
+        m = re.search(r"Location: (.+) \[(cell \d+)\]:(\d+):", line)
+        if m:
+            result.append((m.group(1), m.group(2), int(m.group(3)), []))
+            continue
+        m = re.match(r"(\d+)\t(.*)$", line)
+        if m and result:
+            result[-1][3].append((int(m.group(1)), m.group(2)))
+    return result
+
+
+def py_files(target):
+    return [path for _, path in core.iter_targets(target, {"py_files"})]
+
+
+def strip_run_started(output):
+    return core._RUN_STARTED.sub("", output)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "devenv" / "proj"
+    files = [
+        "a.py",
+        "README.md",
+        "Makefile",
+        "nb/analysis.ipynb",
+        "models/net.pt",
+        "models/net.safetensors",
+        "models/deep/clf.pkl",
+        ".github/scripts/ci.py",
+        "venvs/tool.py",
+        *(f"{name}/hidden.py" for name in core.SKIP_DIRS),
+        "src/.venv/lib/x.ipynb",
+    ]
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x = 1\n")
+    return root
+
+
+def test_iter_targets_buckets_and_skip_dirs(tree):
+    found = set(core.iter_targets(tree, {"py_files", "notebooks", "models"}))
+    assert found == {
+        ("py_files", str(tree / "a.py")),
+        ("py_files", str(tree / ".github" / "scripts" / "ci.py")),
+        ("py_files", str(tree / "venvs" / "tool.py")),
+        ("notebooks", str(tree / "nb" / "analysis.ipynb")),
+        ("models", str(tree / "models" / "net.pt")),
+        ("models", str(tree / "models" / "net.safetensors")),
+        ("models", str(tree / "models" / "deep" / "clf.pkl")),
+    }
+
+
+def test_iter_targets_filters_buckets(tree):
+    assert {bucket for bucket, _ in core.iter_targets(tree, {"models"})} == {"models"}
+    assert list(core.iter_targets(tree, set())) == []
+    assert list(core.iter_targets(tree / "missing", {"py_files"})) == []
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="no symlinks")
+def test_iter_targets_does_not_follow_dir_symlinks(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "x.py").write_text("x = 1\n")
+    root = tmp_path / "root"
+    root.mkdir()
+    try:
+        (root / "link").symlink_to(outside, target_is_directory=True)
+    except OSError:
+        pytest.skip("cannot create symlinks")
+    assert list(core.iter_targets(root, {"py_files"})) == []
+
+
+def test_discover_targets(tree):
+    results = core.discover_targets(tree, scan_notebooks=False, scan_models=False)
+    assert set(results) == {"py_files", "requirements"}
+    assert sorted(results["py_files"]) == sorted(path for _, path in core.iter_targets(tree, {"py_files"}))
+    assert results["requirements"] is None
+
+    (tree / "requirements.txt").write_text("requests\n")
+    results = core.discover_targets(tree, scan_python=False)
+    assert set(results) == {"notebooks", "models", "requirements"}
+    assert results["requirements"] == tree / "requirements.txt"
+    assert len(results["models"]) == 3
+
+
+def test_empty_discovery():
+    assert core.empty_discovery() == {"py_files": [], "notebooks": [], "models": []}
+    assert core.empty_discovery(scan_notebooks=False, scan_python=False) == {"models": []}
+
+
+def test_run_tool_output_and_exit_code():
+    script = "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"
+    assert core.run_tool([sys.executable, "-c", script]) == ("out", 3)
+    # stderr is only reported when stdout is empty
+    script = "import sys; print('  err  ', file=sys.stderr); sys.exit(2)"
+    assert core.run_tool([sys.executable, "-c", script]) == ("err", 2)
+
+
+def test_run_tool_feeds_input_and_drains_both_pipes(tmp_path):
+    # More than a pipe buffer on both streams must not deadlock
+    script = (
+        "import sys; data = sys.stdin.buffer.read(); "
+        "sys.stderr.write('e' * len(data)); sys.stdout.write(str(len(data)))"
+    )
+    output, code = core.run_tool([sys.executable, "-c", script], input=b"x" * 1_000_000)
+    assert (output, code) == ("1000000", 0)
+
+    (tmp_path / "marker").write_text("")
+    script = "import os; print(sorted(os.listdir('.')))"
+    assert core.run_tool([sys.executable, "-c", script], cwd=tmp_path)[0] == "['marker']"
+
+
+def test_run_tool_missing_command():
+    output, code = core.run_tool(["sanityml-no-such-tool"])
+    assert code == -1 and "not found" in output
+
+
+def test_run_tool_timeout_with_grandchild_holding_pipes():
+    # The grandchild inherits stdout/stderr and outlives the killed child
+    script = (
+        "import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(6)']); "
+        "time.sleep(6)"
+    )
+    start = time.monotonic()
+    assert core.run_tool([sys.executable, "-c", script], timeout=1) == ("timed out", -1)
+    assert time.monotonic() - start < 4
+
+
+def test_cell_starts():
+    lines = [
+        "# Converted from x.ipynb",
+        "",
+        "# --- Cell 1 ---",
+        "import os",
+        "",
+        "# --- Cell 4 ---",
+        "os.system('ls')",
+    ]
+    assert core._cell_starts(lines) == [(4, "cell 1"), (7, "cell 4")]
+
+
+def test_remap_stdin_report():
+    # stdin: preamble (1-2), a.ipynb header (3-5), cell 1 (6-7), b.ipynb header (8-9), cell 2 (10-12)
+    starts = [1, 3, 6, 8, 10]
+    segments = [
+        ("<stdin>", "preamble"),
+        ("a.ipynb", "header"),
+        ("a.ipynb", "cell 1"),
+        ("b.ipynb", "header"),
+        ("b.ipynb", "cell 2"),
+    ]
+    output = "\n".join([
+        ">> Issue: [B605:start_process_with_a_shell] ...",
+        "   Location: <stdin>:7:0",
+        "6\timport os",
+        "7\tos.system('x')",
+        "8\t# === FILE: b.ipynb ===",
+        "",
+        ">> Issue: [B404:blacklist] ...",
+        "   Location: <stdin>:10:0",
+        "9\t# --- Cell 2 ---",
+        "10\timport subprocess",
+        "11\tsubprocess.call('ls')",
+    ])
+    assert core._remap_stdin_report(output, starts, segments).splitlines() == [
+        ">> Issue: [B605:start_process_with_a_shell] ...",
+        "   Location: a.ipynb [cell 1]:2:0",
+        "1\timport os",
+        "2\tos.system('x')",
+        "",
+        ">> Issue: [B404:blacklist] ...",
+        "   Location: b.ipynb [cell 2]:1:0",
+        "1\timport subprocess",
+        "2\tsubprocess.call('ls')",
+    ]
+
+
+def test_iter_cells_ijson_matches_json(tmp_path, monkeypatch):
+    pytest.importorskip("ijson")
+    nb = write_notebook(tmp_path / "mixed.ipynb", [
+        ("markdown", ["# Title\n"]),
+        ("code", ["import os\n", "os.system('ls')"]),
+        ("code", "x = 1\ny = 2\n"),
+        ("raw", []),
+    ])
+    for raw in (nb.read_bytes(), (FIXTURES / "malicious_notebook.ipynb").read_bytes()):
+        streamed = list(core._iter_cells(raw))
+        monkeypatch.setattr(core, "_ijson", None)
+        parsed = list(core._iter_cells(raw))
+        monkeypatch.undo()
+        assert streamed == parsed
+        assert streamed
+
+
+def test_json_loads_accepts_nan():
+    # nbformat writes bare NaN/Infinity, which orjson rejects
+    data = core._json_loads(b'{"v": NaN, "w": [Infinity]}')
+    assert data["v"] != data["v"] and data["w"] == [float("inf")]
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_iter_cells_accepts_nan(tmp_path, monkeypatch, streaming):
+    if streaming:
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(core, "_ijson", None)
+    raw = json.dumps({
+        "cells": [
+            {"cell_type": "code", "source": ["x = 1"], "outputs": []},
+            {"cell_type": "code", "source": ["import os\n", "os.system('x')"], "outputs": [{"v": float("nan")}]},
+        ],
+        "metadata": {"w": float("inf")},
+    }).encode()
+    assert b"NaN" in raw
+    assert list(core._iter_cells(raw)) == [("code", ["x = 1"]), ("code", ["import os\n", "os.system('x')"])]
+
+
+@needs_bandit
+def test_scan_notebooks_scans_nan_notebooks(tmp_path):
+    nb = tmp_path / "nan.ipynb"
+    nb.write_text(json.dumps({
+        "cells": [{"cell_type": "code", "source": ["import os\n", "os.system('x')"], "outputs": [{"v": float("nan")}]}],
+        "metadata": {},
+    }))
+    output, code, errors = core.scan_notebooks([str(nb)], use_cache=False)
+    assert code == 1 and errors == []
+    assert (str(nb), "cell 1", 2) in {(n, cell, line) for n, cell, line, _ in findings(output)}
+
+
+@needs_bandit
+def test_scan_notebooks_maps_lines_to_cells(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(FIXTURES / "malicious_notebook.ipynb", project / "first.ipynb")
+    cells = {
+        "cell 1": ["x = 1\n", "print(x)\n"],
+        "cell 3": ["\n", "import pickle\n", "\n", "pickle.loads(b'')\n", "y = 2"],
+        "cell 4": ["import subprocess\n", "subprocess.call('ls', shell=True)"],
+    }
+    second = write_notebook(project / "second.ipynb", [
+        ("code", cells["cell 1"]),
+        ("markdown", ["Some notes\n"]),
+        ("code", cells["cell 3"]),
+        ("code", cells["cell 4"]),
+    ])
+    cells = {(str(second), cell): "".join(src).split("\n") for cell, src in cells.items()}
+    cells[(str(project / "first.ipynb"), "cell 1")] = ["import os", "os.system('echo API_KEY=abc123')"]
+
+    output, code, errors = core.scan_notebooks([str(project / "first.ipynb"), str(second)])
+
+    assert code == 1 and errors == []
+    assert "<stdin>" not in output
+    found = findings(output)
+    assert {(nb, cell, line) for nb, cell, line, _ in found} >= {
+        (str(project / "first.ipynb"), "cell 1", 2),
+        (str(second), "cell 3", 2),
+        (str(second), "cell 3", 4),
+        (str(second), "cell 4", 1),
+        (str(second), "cell 4", 2),
+    }
+    for nb, cell, line, context in found:
+        source = cells[(nb, cell)]
+        assert line in [n for n, _ in context]
+        for n, text in context:
+            expected = source[n - 1] if n <= len(source) else ""
+            assert text.rstrip() == expected.rstrip()
+
+
+@needs_bandit
+def test_scan_notebooks_warm_run_matches_cold(tmp_path, monkeypatch):
+    notebooks = [str(FIXTURES / "malicious_notebook.ipynb")]
+    cold = core.scan_notebooks(notebooks)
+
+    def no_bandit(*args, **kwargs):
+        raise AssertionError("bandit should not run on a warm cache")
+
+    monkeypatch.setattr(core, "run_tool", no_bandit)
+    warm = core.scan_notebooks(notebooks)
+
+    assert "(cached report)" in warm[0]
+    assert (strip_run_started(warm[0]), warm[1], warm[2]) == (strip_run_started(cold[0]), cold[1], cold[2])
+
+
+@needs_bandit
+def test_scan_notebooks_ignores_coding_in_paths(tmp_path, cache_dir):
+    clean = write_notebook(tmp_path / "coding=bogus.ipynb", [("code", ["x = 1\n", "print(x)\n"])])
+    risky = tmp_path / "sub" / "risky.ipynb"
+    risky.parent.mkdir()
+    shutil.copy(FIXTURES / "malicious_notebook.ipynb", risky)
+
+    output, code, errors = core.scan_notebooks([str(clean), str(risky)], use_cache=False)
+
+    assert code == 1 and errors == []
+    assert (str(risky), "cell 1", 2) in {(nb, cell, line) for nb, cell, line, _ in findings(output)}
+    assert not cache_dir.exists()
+
+
+@pytest.mark.parametrize("source", [
+    "x = " + " + ".join(["1"] * 300000),
+    "y = " + "-" * 200000 + "1",
+])
+def test_scan_notebooks_skips_unparseable_nesting(tmp_path, source):
+    nb = write_notebook(tmp_path / "deep.ipynb", [("code", source)])
+    output, code, errors = core.scan_notebooks([str(nb)], use_cache=False)
+    assert code == 0
+    assert len(errors) == 1 and errors[0].startswith("Skipped deep.ipynb: ")
+
+
+@needs_bandit
+def test_bandit_cli_ignores_project_ini(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    (project / "sub").mkdir(parents=True)
+    shutil.copy(FIXTURES / "malicious.py", project / "malicious.py")
+    (project / "sub" / ".bandit").write_text("[bandit]\nskips: B605,B607\n")
+    monkeypatch.setattr(core, "_bandit_config", lambda: None)
+
+    output, code = core.scan_python_files(project, py_files(project))
+
+    assert code == 1
+    assert "B605" in output
+
+
+def test_scan_python_files_stamp_cache(tmp_path, cache_dir, monkeypatch):
+    pytest.importorskip("bandit")
+    if core._bandit_config() is None:
+        pytest.skip("bandit API unavailable")
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(FIXTURES / "malicious.py", project / "malicious.py")
+    (project / "clean.py").write_text("x = 1\n")
+
+    cold = core.scan_python_files(project, py_files(project))
+    assert cold[1] == 1
+    assert len(list(cache_dir.glob("mtimes-*.json"))) == 1
+
+    from bandit.core import manager
+
+    analysed = []
+    run_tests = manager.BanditManager.run_tests
+
+    def spy(self, *args, **kwargs):
+        analysed.extend(self.files_list)
+        return run_tests(self, *args, **kwargs)
+
+    monkeypatch.setattr(manager.BanditManager, "run_tests", spy)
+
+    warm = core.scan_python_files(project, py_files(project))
+    assert analysed == []
+    assert (strip_run_started(warm[0]), warm[1]) == (strip_run_started(cold[0]), cold[1])
+
+    (project / "clean.py").write_text("import pickle\npickle.loads(b'')\n")
+    edited = core.scan_python_files(project, py_files(project))
+    assert analysed == [str(project / "clean.py")]
+    assert "B301" in edited[0] and "B605" in edited[0]
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "x.py").write_text("x = 1\n")
+    core.scan_python_files(other, py_files(other))
+    assert len(list(cache_dir.glob("mtimes-*.json"))) == 2
+
+    analysed.clear()
+    monkeypatch.setattr(core, "_cache_tag", lambda: "sanityml-upgraded")
+    core.scan_python_files(project, py_files(project))
+    assert sorted(analysed) == sorted([str(project / "clean.py"), str(project / "malicious.py")])